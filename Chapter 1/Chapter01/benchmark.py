@@ -0,0 +1,107 @@
+import random
+import sys
+import time
+
+from levels import generate_level, pack, unpack
+from multiball import MultiBall
+from world import World, create_world
+
+
+def autopilot(world):
+    offset = world.ball.x - world.paddle.x
+    world.move_paddle(max(-10, min(10, offset)))
+
+
+def new_world(swept=False, speed=10):
+    world = create_world()
+    world.swept = swept
+    world.setup_game()
+    world.ball.speed = speed
+    return world
+
+
+def run(ticks, swept=False, speed=10):
+    world = new_world(swept, speed)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        if world.state == World.READY:
+            world.start()
+        autopilot(world)
+        if world.step() in (World.WON, World.GAME_OVER):
+            world = new_world(swept, speed)
+    elapsed = time.perf_counter() - start
+    print('%s speed %d: %d ticks in %.3fs: %.0f ticks/sec' %
+          ('swept' if swept else 'discrete', speed,
+           ticks, elapsed, ticks / elapsed))
+
+
+def run_collisions(queries=100000):
+    for rows in (10, 100, 1000):
+        world = World(75 * 100, 20 * rows)
+        for row in range(rows):
+            for col in range(100):
+                world.add_brick(col * 75 + 37.5, row * 20 + 10, 1)
+        rand = random.Random(0)
+        points = [(rand.uniform(0, world.width), rand.uniform(0, world.height))
+                  for _ in range(queries)]
+        start = time.perf_counter()
+        for x, y in points:
+            world.grid.query([x - 10, y - 10, x + 10, y + 10])
+        elapsed = time.perf_counter() - start
+        print('%6d bricks: %.2f us/query' %
+              (len(world.bricks), elapsed / queries * 1e6))
+
+
+def run_multiball(ticks=1000):
+    for count in (100, 500, 2000):
+        world = new_world()
+        world.start()
+        world.extra_balls = MultiBall(world, count)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            autopilot(world)
+            if world.step() != World.RUNNING:
+                world = new_world()
+                world.start()
+                world.extra_balls = MultiBall(world, count)
+        elapsed = time.perf_counter() - start
+        print('%5d balls: %.0f ticks/sec' % (count, ticks / elapsed))
+    # Stress level: 10,000 bricks, so candidate lookup has to go through
+    # the grid rather than test every brick
+    for count in (500, 2000):
+        world = World(100 * 75 + 10, 100 * 20 + 400)
+        world.load_level(generate_level(100, 100))
+        world.setup_game()
+        world.start()
+        world.extra_balls = MultiBall(world, count)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            autopilot(world)
+            world.step()
+        elapsed = time.perf_counter() - start
+        print('%5d balls, %d bricks: %.2f ms/tick' %
+              (count, len(world.bricks), elapsed / ticks * 1e3))
+
+
+def run_levels():
+    for cols, rows in ((8, 3), (100, 100)):
+        data = pack(generate_level(cols, rows))
+        start = time.perf_counter()
+        level = unpack(data)
+        parsed = time.perf_counter() - start
+        world = World(cols * 75 + 10, rows * 20 + 400)
+        start = time.perf_counter()
+        world.load_level(level)
+        built = time.perf_counter() - start
+        print('%6d bricks (%d bytes): parse %.1f ms, build %.1f ms' %
+              (world.brick_count, len(data), parsed * 1e3, built * 1e3))
+
+
+if __name__ == '__main__':
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    run(ticks)
+    for speed in (10, 40, 160):
+        run(ticks, swept=True, speed=speed)
+    run_collisions()
+    run_multiball()
+    run_levels()
@@ -1,114 +1,73 @@
+import argparse
+import time
 import tkinter as tk
 
+from levels import load_level
+from loop import FixedTimestep
+from render import ItemPool, RenderBatch
+from replay import Recorder
+from timing import PhaseTimer
+from world import BRICK_COLORS, World, level_path
+
 
 class GameObject(object):
-    def __init__(self, canvas, item):
-        self.canvas = canvas
-        self.item = item
+    KIND = 'rectangle'
+
+    def __init__(self, pool, body, **options):
+        self.pool = pool
+        self.body = body
+        self.previous = None
+        self.item = pool.acquire(self.KIND, body.get_position(), **options)
 
     def get_position(self):
-        return self.canvas.coords(self.item)
+        return self.body.get_position()
+
+    def remember(self):
+        self.previous = self.body.get_position()
 
-    def move(self, x, y):
-        self.canvas.move(self.item, x, y)
+    def draw(self, batch, alpha=1.0):
+        # Frames land between ticks, so blend the last two tick positions
+        coords = self.body.get_position()
+        if self.previous is not None and alpha < 1.0:
+            coords = [a + (b - a) * alpha
+                      for a, b in zip(self.previous, coords)]
+        batch.coords(self.item, coords)
 
     def delete(self):
-        self.canvas.delete(self.item)
+        self.pool.release(self.KIND, self.item)
 
 
 class Ball(GameObject):
-    def __init__(self, canvas, x, y):
-        self.radius = 10
-        self.direction = [1, -1]
-        self.speed = 10
-        item = canvas.create_oval(x-self.radius, y-self.radius,
-                                  x+self.radius, y+self.radius,
-                                  fill='white')
-        super(Ball, self).__init__(canvas, item)
-
-    def update(self):
-        coords = self.get_position()
-        width = self.canvas.winfo_width()
-        if coords[0] <= 0 or coords[2] >= width:
-            self.direction[0] *= -1
-        if coords[1] <= 0:
-            self.direction[1] *= -1
-        x = self.direction[0] * self.speed
-        y = self.direction[1] * self.speed
-        self.move(x, y)
-
-    def collide(self, game_objects):
-        coords = self.get_position()
-        x = (coords[0] + coords[2]) * 0.5
-        if len(game_objects) > 1:
-            self.direction[1] *= -1
-        elif len(game_objects) == 1:
-            game_object = game_objects[0]
-            coords = game_object.get_position()
-            if x > coords[2]:
-                self.direction[0] = 1
-            elif x < coords[0]:
-                self.direction[0] = -1
-            else:
-                self.direction[1] *= -1
-
-        for game_object in game_objects:
-            if isinstance(game_object, Brick):
-                game_object.hit()
+    KIND = 'oval'
 
+    def __init__(self, pool, ball):
+        super(Ball, self).__init__(pool, ball, fill='white')
 
-class Paddle(GameObject):
-    def __init__(self, canvas, x, y):
-        self.width = 80
-        self.height = 10
-        self.ball = None
-        item = canvas.create_rectangle(x - self.width / 2,
-                                       y - self.height / 2,
-                                       x + self.width / 2,
-                                       y + self.height / 2,
-                                       fill='blue')
-        super(Paddle, self).__init__(canvas, item)
 
-    def set_ball(self, ball):
-        self.ball = ball
-
-    def move(self, offset):
-        coords = self.get_position()
-        width = self.canvas.winfo_width()
-        if coords[0] + offset >= 0 and coords[2] + offset <= width:
-            super(Paddle, self).move(offset, 0)
-            if self.ball is not None:
-                self.ball.move(offset, 0)
+class Paddle(GameObject):
+    def __init__(self, pool, paddle):
+        super(Paddle, self).__init__(pool, paddle, fill='blue',
+                                     tags='paddle')
 
 
 class Brick(GameObject):
-    COLORS = {1: '#999999', 2: '#555555', 3: '#222222'}
-
-    def __init__(self, canvas, x, y, hits):
-        self.width = 75
-        self.height = 20
-        self.hits = hits
-        color = Brick.COLORS[hits]
-        item = canvas.create_rectangle(x - self.width / 2,
-                                       y - self.height / 2,
-                                       x + self.width / 2,
-                                       y + self.height / 2,
-                                       fill=color, tags='brick')
-        super(Brick, self).__init__(canvas, item)
-
-    def hit(self):
-        self.hits -= 1
-        if self.hits == 0:
+    def __init__(self, pool, brick):
+        color = BRICK_COLORS[brick.hits]
+        super(Brick, self).__init__(pool, brick, fill=color, tags='brick')
+
+    def hit(self, batch):
+        if self.body.hits == 0:
             self.delete()
         else:
-            self.canvas.itemconfig(self.item,
-                                   fill=Brick.COLORS[self.hits])
+            batch.itemconfig(self.item, fill=BRICK_COLORS[self.body.hits])
 
 
 class Game(tk.Frame):
-    def __init__(self, master):
+    FRAME_RATE = 60
+    LEVELS = ['level1.txt', 'level2.txt']
+
+    def __init__(self, master, overlay=False, swept=False):
         super(Game, self).__init__(master)
-        self.lives = 3
         self.width = 610
         self.height = 400
         self.canvas = tk.Canvas(self, bg='#aaaaff',
@@ -117,87 +76,213 @@ class Game(tk.Frame):
         self.canvas.pack()
         self.pack()
 
+        self.batch = RenderBatch(self.canvas)
+        self.pool = ItemPool(self.canvas, self.batch)
         self.items = {}
         self.ball = None
-        self.paddle = Paddle(self.canvas, self.width/2, 326)
-        self.items[self.paddle.item] = self.paddle
-        for x in range(5, self.width - 5, 75):
-            self.add_brick(x + 37.5, 50, 2)
-            self.add_brick(x + 37.5, 70, 1)
-            self.add_brick(x + 37.5, 90, 1)
-
+        self.extra_items = []
         self.hud = None
-        self.setup_game()
+        self.bricks_hud = None
+        self.text = None
+        self.level = 0
+        self.world = None
+        self.paddle = None
+        self.looping = False
+        self.held = set()
+        self.releases = {}
+        self.timer = PhaseTimer()
+        self.overlay = None
+        self.show_overlay = overlay
+        self.swept = swept
+
         self.canvas.focus_set()
-        self.canvas.bind('<Left>',
-                         lambda _: self.paddle.move(-10))
-        self.canvas.bind('<Right>',
-                         lambda _: self.paddle.move(10))
-
-    def setup_game(self):
-           self.add_ball()
-           self.update_lives_text()
-           self.text = self.draw_text(300, 200,
-                                      'Press Space to start')
-           self.canvas.bind('<space>', lambda _: self.start_game())
-
-    def add_ball(self):
+        for key in ('Left', 'Right'):
+            self.canvas.bind('<KeyPress-%s>' % key,
+                             lambda _, k=key.lower(): self.key_down(k))
+            self.canvas.bind('<KeyRelease-%s>' % key,
+                             lambda _, k=key.lower(): self.key_up(k))
+        self.canvas.bind('<space>', lambda _: self.world.queue('space'))
+        self.canvas.bind('<m>', lambda _: self.world.queue('multiball'))
+        self.canvas.bind('<n>', lambda _: self.new_game(self.level + 1))
+        self.canvas.bind('<t>', lambda _: self.toggle_overlay())
+        self.new_game(0)
+
+    def new_game(self, level):
+        self.level = level % len(Game.LEVELS)
+        name = Game.LEVELS[self.level]
+        if self.paddle is not None:
+            self.paddle.delete()
+        self.world = World(self.width, self.height, swept=self.swept)
+        self.world.timer = self.timer
+        self.world.listeners.append(self.on_world_event)
+        self.recorder = Recorder(self.world, name)
+        self.paddle = Paddle(self.pool, self.world.paddle)
+        self.world.load_level(load_level(level_path(name)))
+        self.world.setup_game()
+        for key in self.held:
+            self.world.queue(key + '_down')
+        self.timestep = FixedTimestep(self.step, World.TICK)
+        if not self.looping:
+            self.next_frame = time.perf_counter()
+            self.game_loop()
+
+    def key_down(self, key):
+        release = self.releases.pop(key, None)
+        if release is not None:
+            # Auto-repeat sends a release and a press back to back
+            self.after_cancel(release)
+        elif key not in self.held:
+            self.held.add(key)
+            self.world.queue(key + '_down')
+
+    def key_up(self, key):
+        if key not in self.releases:
+            self.releases[key] = self.after(30, self.release_key, key)
+
+    def release_key(self, key):
+        del self.releases[key]
+        self.held.discard(key)
+        self.world.queue(key + '_up')
+
+    def on_world_event(self, event, obj):
+        if event == 'ball':
+            self.add_ball(obj)
+        elif event == 'brick':
+            self.add_brick(obj)
+        elif event == 'level':
+            for brick in self.items.values():
+                brick.delete()
+            self.items = {}
+            for brick in obj:
+                self.add_brick(brick)
+        elif event == 'hit':
+            self.items[obj].hit(self.batch)
+            if obj.hits == 0:
+                del self.items[obj]
+                self.update_bricks_text()
+        elif event == 'state':
+            self.on_state(obj)
+
+    def on_state(self, state):
+        if self.text is not None:
+            self.pool.release('text', self.text)
+            self.text = None
+        if state == World.READY:
+            self.update_lives_text()
+            self.update_bricks_text()
+            self.text = self.draw_text(300, 200, 'Press Space to start')
+        elif state == World.WON:
+            self.text = self.draw_text(300, 200, 'You win!')
+        elif state == World.GAME_OVER:
+            self.text = self.draw_text(300, 200, 'Game Over')
+
+    def add_ball(self, ball):
         if self.ball is not None:
             self.ball.delete()
-        paddle_coords = self.paddle.get_position()
-        x = (paddle_coords[0] + paddle_coords[2]) * 0.5
-        self.ball = Ball(self.canvas, x, 310)
-        self.paddle.set_ball(self.ball)
+        self.ball = Ball(self.pool, ball)
 
-    def add_brick(self, x, y, hits):
-        brick = Brick(self.canvas, x, y, hits)
-        self.items[brick.item] = brick
+    def add_brick(self, brick):
+        self.items[brick] = Brick(self.pool, brick)
 
     def draw_text(self, x, y, text, size='40'):
         font = ('Helvetica', size)
-        return self.canvas.create_text(x, y, text=text,
-                                       font=font)
+        return self.pool.acquire('text', [x, y], text=text, font=font)
 
     def update_lives_text(self):
-        text = 'Lives: %s' % self.lives
+        text = 'Lives: %s' % self.world.lives
         if self.hud is None:
             self.hud = self.draw_text(50, 20, text, 15)
         else:
-            self.canvas.itemconfig(self.hud, text=text)
+            self.batch.itemconfig(self.hud, text=text)
 
-    def start_game(self):
-        self.canvas.unbind('<space>')
-        self.canvas.delete(self.text)
-        self.paddle.ball = None
-        self.game_loop()
-
-    def game_loop(self):
-        self.check_collisions()
-        num_bricks = len(self.canvas.find_withtag('brick'))
-        if num_bricks == 0: 
-            self.ball.speed = None
-            self.draw_text(300, 200, 'You win!')
-        elif self.ball.get_position()[3] >= self.height: 
-            self.ball.speed = None
-            self.lives -= 1
-            if self.lives < 0:
-                self.draw_text(300, 200, 'Game Over')
-            else:
-                self.after(1000, self.setup_game)
+    def update_bricks_text(self):
+        text = 'Bricks: %s' % self.world.brick_count
+        if self.bricks_hud is None:
+            self.bricks_hud = self.draw_text(self.width - 60, 20, text, 15)
         else:
-            self.ball.update()
-            self.after(50, self.game_loop)
-
-    def check_collisions(self):
-        ball_coords = self.ball.get_position()
-        items = self.canvas.find_overlapping(*ball_coords)
-        objects = [self.items[x] for x in items if x in self.items]
-        self.ball.collide(objects)
+            self.batch.itemconfig(self.bricks_hud, text=text)
+
+    def draw_extra_balls(self):
+        balls = self.world.extra_balls
+        positions = balls.get_positions() if balls is not None else []
+        while len(self.extra_items) < len(positions):
+            item = self.pool.acquire('oval', [0, 0, 0, 0], fill='white')
+            self.extra_items.append(item)
+        while len(self.extra_items) > len(positions):
+            self.pool.release('oval', self.extra_items.pop())
+        for item, coords in zip(self.extra_items, positions):
+            self.batch.coords(item, coords.tolist())
+
+    def step(self):
+        self.paddle.remember()
+        self.ball.remember()
+        self.world.step()
+        self.draw_extra_balls()
+        # The unbatched game moved every body that changed, every tick
+        moved = [obj for obj in (self.paddle, self.ball)
+                 if obj.previous != obj.get_position()]
+        self.batch.count_unbatched(len(moved) + len(self.extra_items))
+
+    def draw(self, alpha):
+        self.paddle.draw(self.batch, alpha)
+        self.ball.draw(self.batch, alpha)
+
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+        if not self.show_overlay and self.overlay is not None:
+            self.canvas.delete(self.overlay)
+            self.overlay = None
+
+    def update_overlay(self):
+        text = self.timer.summary()
+        if self.overlay is None:
+            self.overlay = self.canvas.create_text(10, self.height - 10,
+                                                   text=text, anchor='sw',
+                                                   font=('Courier', 9))
+        else:
+            self.canvas.itemconfig(self.overlay, text=text)
 
+    def game_loop(self):
+        # How late Tk ran this frame against its schedule
+        late = time.perf_counter() - self.next_frame
+        self.timer.record('tk_late', max(late, 0.0))
+        self.timestep.advance()
+        t = self.timer.start()
+        self.draw(self.timestep.accumulator / self.timestep.dt)
+        self.batch.flush()
+        self.timer.stop('flush', t)
+        if self.show_overlay and self.world.tick % 10 == 0:
+            self.update_overlay()
+        self.looping = self.world.state not in (World.WON, World.GAME_OVER)
+        if self.looping:
+            frame = 1.0 / Game.FRAME_RATE
+            now = time.perf_counter()
+            self.next_frame = max(self.next_frame + frame, now)
+            delay = int((self.next_frame - now) * 1000)
+            self.after(max(delay, 1), self.game_loop)
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--record', help='save the input replay here')
+    parser.add_argument('--timing', help='dump phase timings to this CSV')
+    parser.add_argument('--overlay', action='store_true',
+                        help='show phase timings on the canvas')
+    parser.add_argument('--swept', action='store_true',
+                        help='use swept collision for the main ball')
+    parser.add_argument('--stats', action='store_true',
+                        help='print render and phase statistics on exit')
+    args = parser.parse_args()
+
     root = tk.Tk()
     root.title('Hello, Pong!')
-    game = Game(root)
+    game = Game(root, overlay=args.overlay, swept=args.swept)
     game.mainloop()
+    if args.record:
+        game.recorder.finish().save(args.record)
+    if args.timing:
+        game.timer.dump_csv(args.timing)
+    if args.stats:
+        print(game.batch.report())
+        print(game.pool.report())
+        print(game.timer.summary())
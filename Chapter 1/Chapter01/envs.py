@@ -0,0 +1,131 @@
+import multiprocessing as mp
+import sys
+import time
+
+import numpy as np
+
+from world import World, create_world
+
+OBSERVATION_SIZE = 7
+
+
+class VecEnv(object):
+    def __init__(self, count, level='level1.txt', paddle_speed=10):
+        self.count = count
+        self.level = level
+        self.paddle_speed = paddle_speed
+        self.worlds = [self._new_world() for _ in range(count)]
+
+    def _new_world(self):
+        world = create_world(level=self.level)
+        world.setup_game()
+        world.start()
+        return world
+
+    def observe(self):
+        obs = np.empty((self.count, OBSERVATION_SIZE), dtype=np.float32)
+        for i, world in enumerate(self.worlds):
+            ball = world.ball
+            obs[i] = (ball.x, ball.y, ball.direction[0], ball.direction[1],
+                      world.paddle.x, world.brick_count, world.lives)
+        return obs
+
+    def reset(self):
+        self.worlds = [self._new_world() for _ in range(self.count)]
+        return self.observe()
+
+    def step(self, actions):
+        rewards = np.zeros(self.count, dtype=np.float32)
+        dones = np.zeros(self.count, dtype=bool)
+        for i, action in enumerate(actions):
+            world = self.worlds[i]
+            bricks = world.brick_count
+            lives = world.lives
+            world.move_paddle(self.paddle_speed * int(action))
+            state = world.step()
+            rewards[i] = (bricks - world.brick_count) - (lives - world.lives)
+            if state == World.READY:
+                world.start()
+            elif state in (World.WON, World.GAME_OVER):
+                dones[i] = True
+                self.worlds[i] = self._new_world()
+        return self.observe(), rewards, dones
+
+    def close(self):
+        pass
+
+
+def _worker(conn, count, level):
+    env = VecEnv(count, level)
+    while True:
+        command, data = conn.recv()
+        if command == 'step':
+            conn.send(env.step(data))
+        elif command == 'reset':
+            conn.send(env.reset())
+        elif command == 'close':
+            conn.close()
+            break
+
+
+class SubprocVecEnv(object):
+    def __init__(self, count, workers=None, level='level1.txt'):
+        workers = min(workers or mp.cpu_count(), count)
+        self.count = count
+        self.bounds = np.linspace(0, count, workers + 1).astype(int)
+        self.conns = []
+        self.processes = []
+        for start, stop in zip(self.bounds[:-1], self.bounds[1:]):
+            parent, child = mp.Pipe()
+            process = mp.Process(target=_worker,
+                                 args=(child, stop - start, level),
+                                 daemon=True)
+            process.start()
+            child.close()
+            self.conns.append(parent)
+            self.processes.append(process)
+
+    def reset(self):
+        for conn in self.conns:
+            conn.send(('reset', None))
+        return np.concatenate([conn.recv() for conn in self.conns])
+
+    def step(self, actions):
+        for conn, start, stop in zip(self.conns, self.bounds[:-1],
+                                     self.bounds[1:]):
+            conn.send(('step', actions[start:stop]))
+        results = [conn.recv() for conn in self.conns]
+        obs, rewards, dones = zip(*results)
+        return (np.concatenate(obs), np.concatenate(rewards),
+                np.concatenate(dones))
+
+    def close(self):
+        for conn in self.conns:
+            conn.send(('close', None))
+        for process in self.processes:
+            process.join()
+
+
+def track_ball(obs):
+    return np.sign(obs[:, 0] - obs[:, 4]).astype(int)
+
+
+def measure(env, steps):
+    obs = env.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        obs, _, _ = env.step(track_ball(obs))
+    elapsed = time.perf_counter() - start
+    env.close()
+    return env.count * steps / elapsed
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    steps = 500
+    print('in-process: %.0f env steps/sec' % measure(VecEnv(count), steps))
+    workers = 1
+    while workers <= mp.cpu_count():
+        rate = measure(SubprocVecEnv(count, workers), steps)
+        print('%2d workers: %.0f env steps/sec' % (workers, rate))
+        workers *= 2
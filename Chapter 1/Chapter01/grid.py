@@ -0,0 +1,62 @@
+import math
+
+
+class BrickGrid(object):
+    def __init__(self, cell_width=75, cell_height=20, origin=(0, 0)):
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.origin = origin
+        self.cells = {}
+        self.placed = {}
+
+    def _spans(self, coords, closed):
+        # Bricks are stored in the cells their interior covers, so a brick
+        # aligned to the grid lands in a single cell. Queries are closed and
+        # also reach cells whose edge the query box only touches.
+        x1 = (coords[0] - self.origin[0]) / self.cell_width
+        x2 = (coords[2] - self.origin[0]) / self.cell_width
+        y1 = (coords[1] - self.origin[1]) / self.cell_height
+        y2 = (coords[3] - self.origin[1]) / self.cell_height
+        if closed:
+            return (range(math.ceil(x1) - 1, math.floor(x2) + 1),
+                    range(math.ceil(y1) - 1, math.floor(y2) + 1))
+        return (range(math.floor(x1), max(math.ceil(x2), math.floor(x1) + 1)),
+                range(math.floor(y1), max(math.ceil(y2), math.floor(y1) + 1)))
+
+    def _iter_cells(self, coords, closed=False):
+        cols, rows = self._spans(coords, closed)
+        for row in rows:
+            for col in cols:
+                yield col, row
+
+    def add(self, brick, cells=None):
+        if cells is None:
+            cells = list(self._iter_cells(brick.get_position()))
+        self.placed[brick] = cells
+        for cell in cells:
+            # dicts keep insertion order, so queries are deterministic
+            bucket = self.cells.get(cell)
+            if bucket is None:
+                bucket = self.cells[cell] = {}
+            bucket[brick] = None
+
+    def remove(self, brick):
+        for cell in self.placed.pop(brick, ()):
+            bucket = self.cells[cell]
+            del bucket[brick]
+            if not bucket:
+                del self.cells[cell]
+
+    def clear(self):
+        self.cells.clear()
+        self.placed.clear()
+
+    def query(self, coords):
+        found = {}
+        for cell in self._iter_cells(coords, closed=True):
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                for brick in bucket:
+                    if brick not in found and brick.overlaps(coords):
+                        found[brick] = None
+        return list(found)
@@ -0,0 +1,125 @@
+import os
+import struct
+import sys
+
+MAGIC = b'BRK1'
+HEADER = struct.Struct('<4sHHff')
+BRICK_WIDTH = 75
+BRICK_HEIGHT = 20
+# Cells pack into two bits, so a brick takes at most three hits
+CELLS = {'.': 0, '1': 1, '2': 2, '3': 3}
+
+
+class Level(object):
+    def __init__(self, cols, rows, cells, origin=(5, 40)):
+        self.cols = cols
+        self.rows = rows
+        self.cells = bytes(cells)
+        self.origin = origin
+
+    def iter_bricks(self):
+        ox = self.origin[0] + BRICK_WIDTH * 0.5
+        oy = self.origin[1] + BRICK_HEIGHT * 0.5
+        cells = self.cells
+        for row in range(self.rows):
+            y = oy + row * BRICK_HEIGHT
+            offset = row * self.cols
+            for col in range(self.cols):
+                hits = cells[offset + col]
+                if hits:
+                    yield col, row, ox + col * BRICK_WIDTH, y, hits
+
+
+def parse_text(text):
+    origin = (5, 40)
+    grid = []
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('origin'):
+            _, x, y = line.split()
+            origin = (float(x), float(y))
+        else:
+            row = []
+            for col, c in enumerate(line, 1):
+                if c not in CELLS:
+                    raise ValueError('line %d, column %d: bad cell %r, '
+                                     'expected ., 1, 2 or 3' %
+                                     (number, col, c))
+                row.append(CELLS[c])
+            grid.append(row)
+    cols = max(len(row) for row in grid) if grid else 0
+    cells = bytearray()
+    for row in grid:
+        cells.extend(row)
+        cells.extend([0] * (cols - len(row)))
+    return Level(cols, len(grid), cells, origin)
+
+
+def to_text(level):
+    lines = ['origin %g %g' % level.origin]
+    for row in range(level.rows):
+        cells = level.cells[row * level.cols:(row + 1) * level.cols]
+        lines.append(''.join(str(c) if c else '.' for c in cells))
+    return '\n'.join(lines) + '\n'
+
+
+def pack(level):
+    # Two bits per cell, four cells per byte
+    cells = level.cells + bytes(-len(level.cells) % 4)
+    packed = bytearray(len(cells) // 4)
+    for i in range(len(packed)):
+        c = cells[i * 4:i * 4 + 4]
+        packed[i] = c[0] | c[1] << 2 | c[2] << 4 | c[3] << 6
+    header = HEADER.pack(MAGIC, level.cols, level.rows, *level.origin)
+    return header + bytes(packed)
+
+
+def unpack(data):
+    magic, cols, rows, ox, oy = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('not a level file')
+    cells = bytearray(len(data[HEADER.size:]) * 4)
+    for i, byte in enumerate(data[HEADER.size:]):
+        cells[i * 4] = byte & 3
+        cells[i * 4 + 1] = byte >> 2 & 3
+        cells[i * 4 + 2] = byte >> 4 & 3
+        cells[i * 4 + 3] = byte >> 6
+    return Level(cols, rows, cells[:cols * rows], (ox, oy))
+
+
+def generate_level(cols, rows, origin=(5, 40)):
+    cells = bytes(1 + (row + col) % 3
+                  for row in range(rows) for col in range(cols))
+    return Level(cols, rows, cells, origin)
+
+
+_cache = {}
+
+
+def load_level(path):
+    mtime = os.path.getmtime(path)
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    if path.endswith('.txt'):
+        with open(path) as f:
+            level = parse_text(f.read())
+    else:
+        with open(path, 'rb') as f:
+            level = unpack(f.read())
+    _cache[path] = (mtime, level)
+    return level
+
+
+def save_level(level, path):
+    with open(path, 'wb') as f:
+        f.write(pack(level))
+
+
+if __name__ == '__main__':
+    for source in sys.argv[1:]:
+        target = os.path.splitext(source)[0] + '.lvl'
+        save_level(load_level(source), target)
+        print('%s -> %s' % (source, target))
@@ -0,0 +1,30 @@
+import time
+
+
+class FixedTimestep(object):
+    def __init__(self, step, dt, max_steps=5, clock=time.perf_counter):
+        self.step = step
+        self.dt = dt
+        self.max_steps = max_steps
+        self.clock = clock
+        self.accumulator = 0.0
+        self.last = None
+        self.dropped = 0
+
+    def advance(self):
+        now = self.clock()
+        if self.last is None:
+            self.last = now
+        self.accumulator += now - self.last
+        self.last = now
+        steps = 0
+        while self.accumulator >= self.dt and steps < self.max_steps:
+            self.step()
+            self.accumulator -= self.dt
+            steps += 1
+        if self.accumulator >= self.dt:
+            # Too far behind: drop the backlog instead of spiralling
+            lag = int(self.accumulator / self.dt)
+            self.dropped += lag
+            self.accumulator -= lag * self.dt
+        return steps
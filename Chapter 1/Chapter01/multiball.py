@@ -0,0 +1,156 @@
+import numpy as np
+
+
+class MultiBall(object):
+    def __init__(self, world, count, spread=40, seed=0):
+        rand = np.random.default_rng(seed)
+        ball = world.ball
+        self.world = world
+        self.radius = ball.radius
+        # Extra balls collide discretely even in swept worlds; capping a
+        # step at one ball diameter keeps them from tunnelling through bricks
+        self.speed = min(ball.speed, 2 * ball.radius)
+        self.positions = np.empty((count, 2))
+        self.positions[:, 0] = ball.x + rand.uniform(-spread, spread, count)
+        self.positions[:, 1] = ball.y + rand.uniform(-spread, 0, count)
+        self.directions = rand.choice([-1.0, 1.0], (count, 2))
+        self.directions[:, 1] = -1
+        self.grid = None
+        self.placed = 0
+        self.bricks = []
+        self.rects = np.empty((1, 4))
+        self.spanning = False
+        self.table = np.full((0, 0, 1), -1)
+        self.corner = (0, 0)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _index_bricks(self, grid):
+        # Mirror the brick grid as a dense cell -> brick slot table. Dead
+        # bricks keep their slot and are masked out by their hits, so the
+        # table is only rebuilt when bricks are added or the level changes.
+        self.grid = grid
+        self.bricks = list(grid.placed)
+        slots = {brick: i for i, brick in enumerate(self.bricks)}
+        # The last row is the paddle, refreshed every step
+        self.rects = np.array([b.get_position() for b in self.bricks] +
+                              [self.world.paddle.get_position()], dtype=float)
+        self.spanning = any(len(cells) > 1 for cells in grid.placed.values())
+        if not grid.cells:
+            self.table = np.full((0, 0, 1), -1)
+            self.corner = (0, 0)
+            return
+        cols = [col for col, _ in grid.cells]
+        rows = [row for _, row in grid.cells]
+        col0, row0 = min(cols), min(rows)
+        depth = max(len(bucket) for bucket in grid.cells.values())
+        table = np.full((max(rows) - row0 + 1, max(cols) - col0 + 1, depth),
+                        -1)
+        for (col, row), bucket in grid.cells.items():
+            for k, brick in enumerate(bucket):
+                table[row - row0, col - col0, k] = slots[brick]
+        self.table = table
+        self.corner = (col0, row0)
+
+    def _sync_bricks(self):
+        grid = self.world.grid
+        if grid is not self.grid or len(grid.placed) > self.placed:
+            self._index_bricks(grid)
+        self.placed = len(grid.placed)
+        self.rects[-1] = self.world.paddle.get_position()
+
+    def _candidates(self, x1, y1, x2, y2):
+        # Ball boxes only reach the few grid cells around them, so look
+        # those up in the table instead of testing every brick
+        grid = self.grid
+        table = self.table
+        col0, row0 = self.corner
+        ox, oy = grid.origin
+        cw, ch = grid.cell_width, grid.cell_height
+        col_lo = np.ceil((x1 - ox) / cw).astype(int) - 1 - col0
+        col_hi = np.floor((x2 - ox) / cw).astype(int) - col0
+        row_lo = np.ceil((y1 - oy) / ch).astype(int) - 1 - row0
+        row_hi = np.floor((y2 - oy) / ch).astype(int) - row0
+        height, width = table.shape[:2]
+        balls, slots = [], []
+        for dc in range(int(2 * self.radius // cw) + 2):
+            col = col_lo + dc
+            in_cols = (col <= col_hi) & (col >= 0) & (col < width)
+            for dr in range(int(2 * self.radius // ch) + 2):
+                row = row_lo + dr
+                idx = np.flatnonzero(in_cols & (row <= row_hi) &
+                                     (row >= 0) & (row < height))
+                found = table[row[idx], col[idx]]
+                for k in range(table.shape[2]):
+                    hit = found[:, k] >= 0
+                    balls.append(idx[hit])
+                    slots.append(found[hit, k])
+        if not balls:
+            return np.empty(0, int), np.empty(0, int)
+        balls = np.concatenate(balls)
+        slots = np.concatenate(slots)
+        if self.spanning:
+            # Unaligned bricks sit in several cells
+            keys = np.unique(balls * len(self.bricks) + slots)
+            balls, slots = np.divmod(keys, len(self.bricks))
+        return balls, slots
+
+    def step(self):
+        self._sync_bricks()
+        p = self.positions
+        d = self.directions
+        r = self.radius
+
+        x1 = p[:, 0] - r
+        y1 = p[:, 1] - r
+        x2 = p[:, 0] + r
+        y2 = p[:, 1] + r
+        balls, slots = self._candidates(x1, y1, x2, y2)
+        if len(slots):
+            seen = np.unique(slots)
+            dead = seen[[self.bricks[i].hits == 0 for i in seen]]
+            rect = self.rects[slots]
+            keep = ((x1[balls] <= rect[:, 2]) & (x2[balls] >= rect[:, 0]) &
+                    (y1[balls] <= rect[:, 3]) & (y2[balls] >= rect[:, 1]) &
+                    ~np.isin(slots, dead))
+            balls = balls[keep]
+            slots = slots[keep]
+        paddle = self.rects[-1]
+        on_paddle = ((x1 <= paddle[2]) & (x2 >= paddle[0]) &
+                     (y1 <= paddle[3]) & (y2 >= paddle[1]))
+
+        count = np.bincount(balls, minlength=len(p)) + on_paddle
+        d[count > 1, 1] *= -1
+        single = np.flatnonzero(count == 1)
+        if len(single):
+            owner = np.full(len(p), len(self.bricks))
+            owner[balls] = slots
+            rect = self.rects[owner[single]]
+            x = p[single, 0]
+            right = x > rect[:, 2]
+            left = x < rect[:, 0]
+            d[single[right], 0] = 1
+            d[single[left], 0] = -1
+            inside = single[~(right | left)]
+            d[inside, 1] *= -1
+
+        hits = np.bincount(slots, minlength=len(self.bricks))
+        for i in np.flatnonzero(hits):
+            brick = self.bricks[i]
+            for _ in range(min(hits[i], brick.hits)):
+                self.world.hit_brick(brick)
+
+        d[(p[:, 0] - r <= 0) | (p[:, 0] + r >= self.world.width), 0] *= -1
+        d[p[:, 1] - r <= 0, 1] *= -1
+        p += d * self.speed
+
+        alive = p[:, 1] + r < self.world.height
+        if not alive.all():
+            self.positions = p[alive]
+            self.directions = d[alive]
+
+    def get_positions(self):
+        p = self.positions
+        r = self.radius
+        return np.column_stack((p - r, p + r))
@@ -0,0 +1,178 @@
+import sys
+import time
+
+import numpy as np
+
+from world import BRICK_COLORS, World, create_world
+
+FONT = {
+    'A': '010101111101101', 'B': '110101110101110', 'C': '011100100100011',
+    'D': '110101101101110', 'E': '111100110100111', 'F': '111100110100100',
+    'G': '011100101101011', 'H': '101101111101101', 'I': '111010010010111',
+    'J': '001001001101010', 'K': '101101110101101', 'L': '100100100100111',
+    'M': '101111111101101', 'N': '110101101101101', 'O': '010101101101010',
+    'P': '110101110100100', 'Q': '010101101110011', 'R': '110101110101101',
+    'S': '011100010001110', 'T': '111010010010010', 'U': '101101101101111',
+    'V': '101101101101010', 'W': '101101111111101', 'X': '101101010101101',
+    'Y': '101101010010010', 'Z': '111001010100111', '0': '111101101101111',
+    '1': '010110010010111', '2': '110001010100111', '3': '110001010001110',
+    '4': '101101111001001', '5': '111100110001110', '6': '011100111101111',
+    '7': '111001010010010', '8': '111101111101111', '9': '111101111001110',
+    ':': '000010000010000', '!': '010010010000010', ' ': '000000000000000',
+}
+
+
+def hex_to_rgb(color):
+    return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+
+
+class RasterRenderer(object):
+    BACKGROUND = hex_to_rgb('#aaaaff')
+    OUTLINE = (0, 0, 0)
+    BALL = (255, 255, 255)
+    PADDLE = (0, 0, 255)
+    TEXT = (0, 0, 0)
+    COLORS = {hits: hex_to_rgb(color)
+              for hits, color in BRICK_COLORS.items()}
+    TEXTS = {World.READY: 'Press Space to start', World.WON: 'You win!',
+             World.GAME_OVER: 'Game Over'}
+
+    def __init__(self, world, scale=2):
+        self.world = world
+        self.scale = scale
+        shape = (world.height, world.width, 3)
+        self.frame = np.empty(shape, dtype=np.uint8)
+        self.background = np.empty(shape, dtype=np.uint8)
+        self.glyphs = {c: np.kron(np.array([int(b) for b in bits], dtype=bool)
+                                  .reshape(5, 3), np.ones((scale, scale),
+                                                          dtype=bool))
+                       for c, bits in FONT.items()}
+        self.disks = {}
+        self.dirty = []
+        self.changed = []
+        self.rebuild = True
+        world.listeners.append(self.on_world_event)
+
+    def on_world_event(self, event, obj):
+        if event in ('hit', 'brick'):
+            self.changed.append(obj)
+        elif event == 'level':
+            self.rebuild = True
+
+    def _slices(self, coords):
+        x1 = max(int(round(coords[0])), 0)
+        y1 = max(int(round(coords[1])), 0)
+        x2 = min(int(round(coords[2])), self.world.width)
+        y2 = min(int(round(coords[3])), self.world.height)
+        if x1 >= x2 or y1 >= y2:
+            return None
+        return slice(y1, y2), slice(x1, x2)
+
+    def _draw_brick(self, brick):
+        area = self._slices(brick.get_position())
+        if area is None:
+            return
+        if brick.hits == 0:
+            self.background[area] = RasterRenderer.BACKGROUND
+        else:
+            self.background[area] = RasterRenderer.OUTLINE
+            rows, cols = area
+            inner = (slice(rows.start + 1, rows.stop - 1),
+                     slice(cols.start + 1, cols.stop - 1))
+            self.background[inner] = RasterRenderer.COLORS[brick.hits]
+        self.frame[area] = self.background[area]
+
+    def _redraw_background(self):
+        self.background[:] = RasterRenderer.BACKGROUND
+        self.frame[:] = RasterRenderer.BACKGROUND
+        for brick in self.world.bricks:
+            self._draw_brick(brick)
+        self.dirty = []
+        self.changed = []
+        self.rebuild = False
+
+    def _fill(self, coords, color):
+        area = self._slices(coords)
+        if area is not None:
+            self.frame[area] = color
+            self.dirty.append(area)
+
+    def _disk(self, coords, color):
+        area = self._slices(coords)
+        if area is None:
+            return
+        size = int(round(coords[2] - coords[0]))
+        mask = self.disks.get(size)
+        if mask is None:
+            r = (size - 1) * 0.5
+            y, x = np.ogrid[:size, :size]
+            mask = self.disks[size] = (x - r) ** 2 + (y - r) ** 2 <= r * r
+        rows, cols = area
+        x0 = rows.start - int(round(coords[1]))
+        y0 = cols.start - int(round(coords[0]))
+        mask = mask[x0:x0 + rows.stop - rows.start,
+                    y0:y0 + cols.stop - cols.start]
+        self.frame[area][mask] = color
+        self.dirty.append(area)
+
+    def _text(self, x, y, text, anchor_center=True):
+        step = 4 * self.scale
+        if anchor_center:
+            x -= len(text) * step // 2
+            y -= 5 * self.scale // 2
+        for c in text.upper():
+            glyph = self.glyphs.get(c, self.glyphs[' '])
+            area = self._slices([x, y, x + glyph.shape[1], y + glyph.shape[0]])
+            if area is not None:
+                rows, cols = area
+                glyph = glyph[:rows.stop - rows.start, :cols.stop - cols.start]
+                self.frame[area][glyph] = RasterRenderer.TEXT
+                self.dirty.append(area)
+            x += step
+
+    def render(self):
+        if self.rebuild:
+            self._redraw_background()
+        for area in self.dirty:
+            self.frame[area] = self.background[area]
+        self.dirty = []
+        for brick in self.changed:
+            self._draw_brick(brick)
+        self.changed = []
+
+        world = self.world
+        self._fill(world.paddle.get_position(), RasterRenderer.PADDLE)
+        if world.ball is not None:
+            self._disk(world.ball.get_position(), RasterRenderer.BALL)
+        if world.extra_balls is not None:
+            for coords in world.extra_balls.get_positions():
+                self._disk(coords, RasterRenderer.BALL)
+        self._text(50, 20, 'Lives: %s' % world.lives)
+        self._text(world.width - 60, 20, 'Bricks: %s' % world.brick_count)
+        text = RasterRenderer.TEXTS.get(world.state)
+        if text is not None:
+            self._text(300, 200, text)
+        return self.frame
+
+
+def save_ppm(frame, path):
+    with open(path, 'wb') as f:
+        f.write(b'P6 %d %d 255\n' % (frame.shape[1], frame.shape[0]))
+        f.write(frame.tobytes())
+
+
+if __name__ == '__main__':
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    world = create_world()
+    renderer = RasterRenderer(world)
+    world.setup_game()
+    world.start()
+    start = time.perf_counter()
+    for _ in range(frames):
+        world.move_paddle(max(-10, min(10, world.ball.x - world.paddle.x)))
+        world.step()
+        frame = renderer.render()
+    elapsed = time.perf_counter() - start
+    print('%d frames in %.3fs: %.0f frames/sec' %
+          (frames, elapsed, frames / elapsed))
+    save_ppm(frame, 'frame.ppm')
@@ -0,0 +1,76 @@
+class RenderBatch(object):
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.positions = {}
+        self.options = {}
+        self.flushed = {}
+        self.frames = 0
+        self.requested = 0
+        self.issued = 0
+        self.unbatched = 0
+
+    def coords(self, item, coords):
+        self.requested += 1
+        self.positions[item] = coords
+
+    def itemconfig(self, item, **options):
+        # Without the batch every option change was its own canvas call
+        self.requested += 1
+        self.unbatched += 1
+        self.options.setdefault(item, {}).update(options)
+
+    def count_unbatched(self, calls):
+        # Moves are drawn once per frame here, but the unbatched game issued
+        # them once per tick; the caller knows how many it would have made
+        self.unbatched += calls
+
+    def flush(self):
+        for item, coords in self.positions.items():
+            if self.flushed.get(item) != coords:
+                self.canvas.coords(item, *coords)
+                self.flushed[item] = coords
+                self.issued += 1
+        for item, options in self.options.items():
+            self.canvas.itemconfig(item, **options)
+            self.issued += 1
+        self.positions.clear()
+        self.options.clear()
+        self.frames += 1
+
+    def report(self):
+        frames = max(self.frames, 1)
+        return ('%d frames: %.2f canvas calls/frame unbatched, '
+                '%.2f requested, %.2f issued, %.2f saved' %
+                (self.frames, self.unbatched / frames,
+                 self.requested / frames, self.issued / frames,
+                 (self.unbatched - self.issued) / frames))
+
+
+class ItemPool(object):
+    def __init__(self, canvas, batch):
+        self.canvas = canvas
+        self.batch = batch
+        self.free = {}
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, kind, coords, **options):
+        free = self.free.get(kind)
+        if free:
+            item = free.pop()
+            self.batch.coords(item, coords)
+            self.batch.itemconfig(item, state='normal', **options)
+            self.reused += 1
+        else:
+            create = getattr(self.canvas, 'create_' + kind)
+            item = create(*coords, **options)
+            self.created += 1
+        return item
+
+    def release(self, kind, item):
+        self.batch.itemconfig(item, state='hidden')
+        self.free.setdefault(kind, []).append(item)
+
+    def report(self):
+        return '%d canvas items created, %d reused' % (self.created,
+                                                       self.reused)
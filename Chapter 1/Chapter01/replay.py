@@ -0,0 +1,81 @@
+import sys
+import time
+
+from world import World, create_world
+
+
+class Recording(object):
+    def __init__(self, level='level1.txt', ticks=0, events=None,
+                 swept=False):
+        self.level = level
+        self.ticks = ticks
+        self.swept = swept
+        self.events = events if events is not None else []
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            f.write('level %s\n' % self.level)
+            f.write('ticks %d\n' % self.ticks)
+            if self.swept:
+                f.write('swept 1\n')
+            for tick, action in self.events:
+                f.write('%d %s\n' % (tick, action))
+
+
+class Recorder(object):
+    def __init__(self, world, level):
+        self.world = world
+        self.recording = Recording(level, swept=world.swept)
+        world.listeners.append(self.on_world_event)
+
+    def on_world_event(self, event, obj):
+        if event == 'input':
+            self.recording.events.append((self.world.tick, obj))
+
+    def finish(self):
+        self.recording.ticks = self.world.tick
+        return self.recording
+
+
+def load_recording(path):
+    recording = Recording()
+    with open(path) as f:
+        for line in f:
+            key, value = line.split()
+            if key == 'level':
+                recording.level = value
+            elif key == 'ticks':
+                recording.ticks = int(value)
+            elif key == 'swept':
+                recording.swept = bool(int(value))
+            else:
+                recording.events.append((int(key), value))
+    return recording
+
+
+def brick_state(world):
+    return sorted((brick.x, brick.y, brick.hits) for brick in world.bricks)
+
+
+def replay(recording):
+    world = create_world(level=recording.level)
+    world.swept = recording.swept
+    world.setup_game()
+    events = recording.events
+    i = 0
+    while world.tick < recording.ticks:
+        while i < len(events) and events[i][0] == world.tick:
+            world.queue(events[i][1])
+            i += 1
+        if world.step() in (World.WON, World.GAME_OVER):
+            break
+    return world
+
+
+if __name__ == '__main__':
+    recording = load_recording(sys.argv[1])
+    start = time.perf_counter()
+    world = replay(recording)
+    elapsed = time.perf_counter() - start
+    print('%d ticks replayed in %.3fs: %s, %d lives, %d bricks left' %
+          (world.tick, elapsed, world.state, world.lives, world.brick_count))
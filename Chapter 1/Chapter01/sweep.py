@@ -0,0 +1,43 @@
+EPSILON = 1e-9
+
+
+def _slab(start, motion, low, high):
+    if motion == 0:
+        if low <= start <= high:
+            return float('-inf'), float('inf')
+        return float('inf'), float('-inf')
+    t0 = (low - start) / motion
+    t1 = (high - start) / motion
+    return (t0, t1) if t0 <= t1 else (t1, t0)
+
+
+def sweep_circle(x, y, dx, dy, radius, coords):
+    # Moving circle against a box is a ray against the box grown by the
+    # radius. Rounded corners are treated as square, which is close enough
+    # for a ball that only bounces axis-aligned.
+    x0, y0 = _slab(x, dx, coords[0] - radius, coords[2] + radius)
+    x1, y1 = _slab(y, dy, coords[1] - radius, coords[3] + radius)
+    entry = max(x0, x1)
+    leave = min(y0, y1)
+    if entry > leave or leave <= EPSILON or entry < 0 or entry > 1:
+        return None
+    if x0 >= x1:
+        return entry, 1, 0
+    return entry, 0, 1
+
+
+def sweep_walls(x, y, dx, dy, radius, width):
+    hit = None
+    if dx < 0:
+        t = (radius - x) / dx
+        hit = (t, 1, 0)
+    elif dx > 0:
+        t = (width - radius - x) / dx
+        hit = (t, 1, 0)
+    if dy < 0:
+        t = (radius - y) / dy
+        if hit is None or t < hit[0]:
+            hit = (t, 0, 1)
+    if hit is not None and 0 <= hit[0] <= 1:
+        return hit
+    return None
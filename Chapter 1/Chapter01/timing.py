@@ -0,0 +1,67 @@
+import csv
+import time
+
+from collections import deque
+
+
+class PhaseTimer(object):
+    def __init__(self, window=600, clock=time.perf_counter):
+        self.window = window
+        self.clock = clock
+        self.samples = {}
+        self.counts = {}
+
+    def start(self):
+        return self.clock()
+
+    def stop(self, phase, start):
+        now = self.clock()
+        self.record(phase, now - start)
+        return now
+
+    def record(self, phase, seconds):
+        samples = self.samples.get(phase)
+        if samples is None:
+            samples = self.samples[phase] = deque(maxlen=self.window)
+            self.counts[phase] = 0
+        samples.append(seconds)
+        self.counts[phase] += 1
+
+    def percentiles(self, phase, points=(50, 95, 99)):
+        samples = sorted(self.samples.get(phase, ()))
+        if not samples:
+            return [0.0] * len(points)
+        last = len(samples) - 1
+        return [samples[min(last, int(p / 100.0 * len(samples)))]
+                for p in points]
+
+    def summary(self):
+        lines = []
+        for phase in self.samples:
+            p50, p95, p99 = self.percentiles(phase)
+            lines.append('%-16s %7.3f %7.3f %7.3f ms' %
+                         (phase, p50 * 1e3, p95 * 1e3, p99 * 1e3))
+        return '\n'.join(lines)
+
+    def dump_csv(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['phase', 'count', 'p50_ms', 'p95_ms', 'p99_ms'])
+            for phase in self.samples:
+                writer.writerow([phase, self.counts[phase]] +
+                                ['%.4f' % (p * 1e3)
+                                 for p in self.percentiles(phase)])
+
+
+class NullTimer(object):
+    def start(self):
+        return 0
+
+    def stop(self, phase, start):
+        return 0
+
+    def record(self, phase, seconds):
+        pass
+
+
+NULL_TIMER = NullTimer()
@@ -0,0 +1,311 @@
+import os
+
+from collections import Counter
+
+from grid import BrickGrid
+from levels import load_level
+from sweep import sweep_circle, sweep_walls
+from timing import NULL_TIMER
+
+BRICK_COLORS = {1: '#999999', 2: '#555555', 3: '#222222'}
+
+
+class Body(object):
+    def __init__(self, x, y, width, height):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    def get_position(self):
+        w = self.width * 0.5
+        h = self.height * 0.5
+        return [self.x - w, self.y - h, self.x + w, self.y + h]
+
+    def move(self, x, y):
+        self.x += x
+        self.y += y
+
+    def overlaps(self, coords):
+        own = self.get_position()
+        return (own[0] <= coords[2] and own[2] >= coords[0] and
+                own[1] <= coords[3] and own[3] >= coords[1])
+
+
+class Ball(Body):
+    def __init__(self, x, y):
+        self.radius = 10
+        self.direction = [1, -1]
+        self.speed = 10
+        super(Ball, self).__init__(x, y, self.radius * 2, self.radius * 2)
+
+    def update(self, width):
+        coords = self.get_position()
+        if coords[0] <= 0 or coords[2] >= width:
+            self.direction[0] *= -1
+        if coords[1] <= 0:
+            self.direction[1] *= -1
+        x = self.direction[0] * self.speed
+        y = self.direction[1] * self.speed
+        self.move(x, y)
+
+    def collide(self, game_objects):
+        x = self.x
+        if len(game_objects) > 1:
+            self.direction[1] *= -1
+        elif len(game_objects) == 1:
+            coords = game_objects[0].get_position()
+            if x > coords[2]:
+                self.direction[0] = 1
+            elif x < coords[0]:
+                self.direction[0] = -1
+            else:
+                self.direction[1] *= -1
+
+
+class Paddle(Body):
+    def __init__(self, x, y):
+        self.ball = None
+        super(Paddle, self).__init__(x, y, 80, 10)
+
+    def set_ball(self, ball):
+        self.ball = ball
+
+    def move(self, offset, width):
+        coords = self.get_position()
+        if coords[0] + offset >= 0 and coords[2] + offset <= width:
+            super(Paddle, self).move(offset, 0)
+            if self.ball is not None:
+                self.ball.move(offset, 0)
+
+
+class Brick(Body):
+    def __init__(self, x, y, hits):
+        self.hits = hits
+        super(Brick, self).__init__(x, y, 75, 20)
+
+    def hit(self):
+        self.hits -= 1
+        return self.hits
+
+
+class World(object):
+    READY = 'ready'
+    RUNNING = 'running'
+    RESPAWNING = 'respawning'
+    WON = 'won'
+    GAME_OVER = 'game over'
+
+    TICK = 0.05
+    RESPAWN_TICKS = 20
+    PADDLE_SPEED = 15
+    MAX_BOUNCES = 8
+
+    def __init__(self, width=610, height=400, lives=3, swept=False):
+        self.width = width
+        self.height = height
+        self.lives = lives
+        self.swept = swept
+        self.tick = 0
+        self.state = None
+        self.countdown = 0
+        self.listeners = []
+        self.pending = []
+        self.held = set()
+        self.timer = NULL_TIMER
+        self.bricks = {}
+        self.grid = BrickGrid()
+        self.brick_count = 0
+        self.row_counts = Counter()
+        self.hit_counts = Counter()
+        self.ball = None
+        self.extra_balls = None
+        self.paddle = Paddle(width / 2, 326)
+
+    def notify(self, event, obj=None):
+        for listener in self.listeners:
+            listener(event, obj)
+
+    def set_state(self, state):
+        self.state = state
+        self.notify('state', state)
+
+    def _insert_brick(self, brick):
+        self.bricks[brick] = None
+        self.grid.add(brick)
+        self.brick_count += 1
+        self.row_counts[brick.y] += 1
+        self.hit_counts[brick.hits] += 1
+
+    def add_brick(self, x, y, hits):
+        brick = Brick(x, y, hits)
+        self._insert_brick(brick)
+        self.notify('brick', brick)
+        return brick
+
+    def load_level(self, level):
+        grid = BrickGrid(origin=level.origin)
+        bricks = []
+        for col, row, x, y, hits in level.iter_bricks():
+            brick = Brick(x, y, hits)
+            bricks.append(brick)
+            grid.add(brick, [(col, row)])
+        self.grid = grid
+        self.bricks = dict.fromkeys(bricks)
+        self.brick_count = len(bricks)
+        self.row_counts = Counter(brick.y for brick in bricks)
+        self.hit_counts = Counter(brick.hits for brick in bricks)
+        self.notify('level', bricks)
+
+    def add_ball(self):
+        self.ball = Ball(self.paddle.x, 310)
+        self.paddle.set_ball(self.ball)
+        self.notify('ball', self.ball)
+
+    def setup_game(self):
+        self.extra_balls = None
+        self.add_ball()
+        self.set_state(World.READY)
+
+    def start(self):
+        if self.state == World.READY:
+            self.paddle.set_ball(None)
+            self.set_state(World.RUNNING)
+
+    def move_paddle(self, offset):
+        if self.state in (World.READY, World.RUNNING):
+            self.paddle.move(offset, self.width)
+
+    def spawn_balls(self, count=500):
+        if self.state == World.RUNNING:
+            # NumPy is only needed once extra balls are in play
+            from multiball import MultiBall
+            self.extra_balls = MultiBall(self, count)
+
+    def queue(self, action):
+        self.pending.append(action)
+
+    def apply(self, action):
+        self.notify('input', action)
+        if action == 'left':
+            self.move_paddle(-10)
+        elif action == 'right':
+            self.move_paddle(10)
+        elif action == 'space':
+            self.start()
+        elif action == 'multiball':
+            self.spawn_balls()
+        elif action.endswith('_down'):
+            self.held.add(action[:-5])
+        elif action.endswith('_up'):
+            self.held.discard(action[:-3])
+
+    def step(self):
+        if self.pending:
+            pending, self.pending = self.pending, []
+            for action in pending:
+                self.apply(action)
+        if self.held:
+            direction = ('right' in self.held) - ('left' in self.held)
+            if direction:
+                self.move_paddle(direction * World.PADDLE_SPEED)
+        self.tick += 1
+        if self.state == World.RUNNING:
+            timer = self.timer
+            t = timer.start()
+            if self.swept:
+                self.sweep_ball()
+                t = timer.stop('sweep_ball', t)
+            else:
+                self.check_collisions()
+                t = timer.stop('check_collisions', t)
+            if self.extra_balls is not None:
+                self.extra_balls.step()
+                t = timer.stop('extra_balls', t)
+            won = self.brick_count == 0
+            t = timer.stop('brick_count', t)
+            if won:
+                self.set_state(World.WON)
+            elif self.ball.get_position()[3] >= self.height:
+                self.lives -= 1
+                if self.lives < 0:
+                    self.set_state(World.GAME_OVER)
+                else:
+                    self.countdown = World.RESPAWN_TICKS
+                    self.set_state(World.RESPAWNING)
+            elif not self.swept:
+                self.ball.update(self.width)
+                timer.stop('ball.update', t)
+        elif self.state == World.RESPAWNING:
+            self.countdown -= 1
+            if self.countdown <= 0:
+                self.setup_game()
+        return self.state
+
+    def check_collisions(self):
+        coords = self.ball.get_position()
+        objects = self.grid.query(coords)
+        if self.paddle.overlaps(coords):
+            objects.insert(0, self.paddle)
+        self.ball.collide(objects)
+        for obj in objects:
+            if isinstance(obj, Brick):
+                self.hit_brick(obj)
+
+    def sweep_ball(self):
+        ball = self.ball
+        r = ball.radius
+        remaining = 1.0
+        for _ in range(World.MAX_BOUNCES):
+            dx = ball.direction[0] * ball.speed * remaining
+            dy = ball.direction[1] * ball.speed * remaining
+            first = sweep_walls(ball.x, ball.y, dx, dy, r, self.width)
+            target = None
+            area = [min(ball.x, ball.x + dx) - r, min(ball.y, ball.y + dy) - r,
+                    max(ball.x, ball.x + dx) + r, max(ball.y, ball.y + dy) + r]
+            objects = self.grid.query(area)
+            if self.paddle.overlaps(area):
+                objects.append(self.paddle)
+            for obj in objects:
+                hit = sweep_circle(ball.x, ball.y, dx, dy, r,
+                                   obj.get_position())
+                if hit is not None and (first is None or hit[0] < first[0]):
+                    first = hit
+                    target = obj
+            if first is None:
+                ball.move(dx, dy)
+                return
+            t, flip_x, flip_y = first
+            ball.move(dx * t, dy * t)
+            if flip_x:
+                ball.direction[0] *= -1
+            if flip_y:
+                ball.direction[1] *= -1
+            if isinstance(target, Brick):
+                self.hit_brick(target)
+            remaining *= 1 - t
+
+    def hit_brick(self, brick):
+        self.hit_counts[brick.hits] -= 1
+        if brick.hit() == 0:
+            del self.bricks[brick]
+            self.grid.remove(brick)
+            self.brick_count -= 1
+            self.row_counts[brick.y] -= 1
+        else:
+            self.hit_counts[brick.hits] += 1
+        self.notify('hit', brick)
+
+
+LEVELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'levels')
+
+
+def level_path(name):
+    return os.path.join(LEVELS_DIR, name)
+
+
+def create_world(width=610, height=400, level='level1.txt'):
+    world = World(width, height)
+    world.load_level(load_level(level_path(level)))
+    return world
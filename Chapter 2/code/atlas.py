@@ -0,0 +1,126 @@
+import glob
+import json
+import os
+
+from pyglet.image import load, Animation, ImageData
+
+
+class Assets(object):
+    BORDER = 1
+
+    def __init__(self, directory='img', cache_dir='.atlas-cache'):
+        self.directory = directory
+        self.cache_dir = cache_dir
+        self.texture = None
+        self.regions = {}
+        self.images = {}
+        self.animations = {}
+
+    def _sources(self):
+        return sorted(glob.glob(os.path.join(self.directory, '*.png')))
+
+    def _pack(self, sources):
+        decoded = []
+        for path in sources:
+            img = load(path).get_image_data()
+            data = img.get_data('RGBA', img.width * 4)
+            decoded.append((path, img.width, img.height, data))
+        decoded.sort(key=lambda item: -item[2])
+
+        border = Assets.BORDER
+        width = 256
+        while any(w + 2 * border > width for _, w, _, _ in decoded):
+            width *= 2
+        regions = {}
+        x = y = shelf = 0
+        for path, w, h, _ in decoded:
+            if x + w + 2 * border > width:
+                x = 0
+                y += shelf
+                shelf = 0
+            regions[path] = (x + border, y + border, w, h)
+            x += w + 2 * border
+            shelf = max(shelf, h + 2 * border)
+        height = 1
+        while height < y + shelf:
+            height *= 2
+
+        pixels = bytearray(width * height * 4)
+        for path, w, h, data in decoded:
+            rx, ry = regions[path][:2]
+            for row in range(h):
+                start = ((ry + row) * width + rx) * 4
+                pixels[start:start + w * 4] = data[row * w * 4:(row + 1) * w * 4]
+        return width, height, bytes(pixels), regions
+
+    def _load_cache(self, sources):
+        index = os.path.join(self.cache_dir, 'atlas.json')
+        if not os.path.exists(index):
+            return None
+        with open(index) as f:
+            meta = json.load(f)
+        mtimes = {path: os.path.getmtime(path) for path in sources}
+        if meta['sources'] != mtimes:
+            return None
+        with open(os.path.join(self.cache_dir, 'atlas.rgba'), 'rb') as f:
+            pixels = f.read()
+        regions = {path: tuple(r) for path, r in meta['regions'].items()}
+        return meta['width'], meta['height'], pixels, regions
+
+    def _save_cache(self, sources, width, height, pixels, regions):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, 'atlas.rgba'), 'wb') as f:
+            f.write(pixels)
+        meta = {'width': width, 'height': height, 'regions': regions,
+                'sources': {path: os.path.getmtime(path)
+                            for path in sources}}
+        with open(os.path.join(self.cache_dir, 'atlas.json'), 'w') as f:
+            json.dump(meta, f)
+
+    def build(self):
+        sources = self._sources()
+        packed = self._load_cache(sources)
+        if packed is None:
+            packed = self._pack(sources)
+            self._save_cache(sources, *packed)
+        width, height, pixels, regions = packed
+        self.regions = regions
+        return ImageData(width, height, 'RGBA', pixels)
+
+    def _region(self, path, x=0, y=0, width=None, height=None):
+        if self.texture is None:
+            self.texture = self.build().get_texture()
+        rx, ry, rw, rh = self.regions[os.path.normpath(path)]
+        return self.texture.get_region(rx + x, ry + y,
+                                       width or rw, height or rh)
+
+    def image(self, path):
+        region = self.images.get(path)
+        if region is None:
+            region = self.images[path] = self._region(path)
+        return region
+
+    def animation(self, path, rows=2, cols=1, period=0.5):
+        key = (path, rows, cols, period)
+        anim = self.animations.get(key)
+        if anim is None:
+            if self.texture is None:
+                self.texture = self.build().get_texture()
+            w, h = self.regions[os.path.normpath(path)][2:]
+            fw, fh = w // cols, h // rows
+            frames = [self._region(path, col * fw, row * fh, fw, fh)
+                      for row in range(rows) for col in range(cols)]
+            anim = Animation.from_image_sequence(frames, period)
+            self.animations[key] = anim
+        return anim
+
+
+assets = Assets()
+
+
+def image(path):
+    return assets.image(path)
+
+
+def animation(path, rows=2, cols=1, period=0.5):
+    return assets.animation(path, rows, cols, period)
@@ -0,0 +1,120 @@
+import sys
+import time
+
+from pyglet.gl import glFinish
+from pyglet.window import key
+
+import cocos.director
+import cocos.scene
+
+from chapter2_04 import GameLayer, HUD, PlayerCannon, Wave
+from collision import PersistentCollisionGrid
+
+WIDTH, HEIGHT = 800, 650
+DT = 1 / 60.0
+
+
+class CollisionClock(object):
+    # A kill inside check_collisions also touches the grid; nested sections
+    # are only counted once
+    def __init__(self):
+        self.total = 0.0
+        self.depth = 0
+        self.start = 0.0
+
+    def enter(self):
+        if self.depth == 0:
+            self.start = time.perf_counter()
+        self.depth += 1
+
+    def exit(self):
+        self.depth -= 1
+        if self.depth == 0:
+            self.total += time.perf_counter() - self.start
+
+
+class TimedCollisionGrid(PersistentCollisionGrid):
+    # Grid upkeep happens inside Actor.place and Actor.move, so it is timed
+    # here rather than left under the update phase
+    def __init__(self, clock, *args):
+        super(TimedCollisionGrid, self).__init__(*args)
+        self.clock = clock
+
+    def add(self, obj):
+        self.clock.enter()
+        super(TimedCollisionGrid, self).add(obj)
+        self.clock.exit()
+
+    def remove_tricky(self, obj):
+        self.clock.enter()
+        super(TimedCollisionGrid, self).remove_tricky(obj)
+        self.clock.exit()
+
+    def update(self, obj):
+        self.clock.enter()
+        super(TimedCollisionGrid, self).update(obj)
+        self.clock.exit()
+
+
+class TimedGameLayer(GameLayer):
+    def __init__(self, hud, wave):
+        super(TimedGameLayer, self).__init__(hud, wave)
+        self.clock = CollisionClock()
+        grid = self.collman
+        self.collman = TimedCollisionGrid(
+            self.clock, grid.xmin, grid.xmax, grid.ymin, grid.ymax,
+            grid.cell_width, grid.cell_height)
+
+    def check_collisions(self):
+        self.clock.enter()
+        super(TimedGameLayer, self).check_collisions()
+        self.clock.exit()
+
+
+def percentile(samples, point):
+    return samples[min(len(samples) - 1, int(point / 100.0 * len(samples)))]
+
+
+def run(count, frames):
+    # Frames are stepped by hand instead of through the pyglet clock, so the
+    # layer's own scheduled update never fires
+    wave = Wave.fit(count, WIDTH, HEIGHT)
+    hud = HUD()
+    layer = TimedGameLayer(hud, wave)
+    layer.lives = 10 ** 6
+    scene = cocos.scene.Scene(layer, hud)
+    aliens = layer.alien_group.count
+    scene.on_enter()
+    PlayerCannon.KEYS_PRESSED[key.SPACE] = 1
+    window = cocos.director.director.window
+    updated = drawn = 0.0
+    times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        layer.update(DT)
+        middle = time.perf_counter()
+        window.clear()
+        scene.visit()
+        glFinish()
+        end = time.perf_counter()
+        updated += middle - start
+        drawn += end - middle
+        times.append(end - start)
+    scene.on_exit()
+    PlayerCannon.KEYS_PRESSED[key.SPACE] = 0
+    times.sort()
+    ms = 1e3 / frames
+    print('%6d aliens (%dx%d, cell %.1f): frame %.3f ms (p95 %.3f, max %.3f), '
+          'update %.3f ms (collisions %.3f ms), draw %.3f ms' %
+          (aliens, wave.cols, wave.rows, layer.collman.cell_width,
+           (updated + drawn) * ms, percentile(times, 95) * 1e3,
+           times[-1] * 1e3, updated * ms, layer.clock.total * ms,
+           drawn * ms))
+
+
+if __name__ == '__main__':
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    cocos.director.director.init(caption='Cocos Invaders benchmark',
+                                 width=WIDTH, height=HEIGHT)
+    for count in (100, 1000, 10000):
+        run(count, frames)
@@ -1,27 +1,84 @@
+import argparse
+import math
 import random
 
 from collections import defaultdict
 
-from pyglet.image import load, ImageGrid, Animation
+import numpy as np
+
+from pyglet import gl
 from pyglet.window import key
 
+import cocos.batch
 import cocos.layer
 import cocos.sprite
 import cocos.collision_model as cm
 import cocos.euclid as eu
 
+import atlas
+import profiler
+from collision import PersistentCollisionGrid, tune_cell_size
+from digits import DigitCounter
+from pool import ProjectilePool
+from scheduler import TimerWheel
+
 
 class Actor(cocos.sprite.Sprite):
-    def __init__(self, image, x, y):
-        super(Actor, self).__init__(image)
+    active = True
+    dead = False
+
+    def __init__(self, image, x, y, scale=1):
+        if isinstance(image, str):
+            image = atlas.image(image)
+        super(Actor, self).__init__(image, scale=scale)
         self.position = eu.Vector2(x, y)
-        self.cshape = cm.AARectShape(self.position,
+        self.cshape = cm.AARectShape(eu.Vector2(x, y),
                                      self.width * 0.5,
                                      self.height * 0.5)
+        self.collman = None
+
+    def on_enter(self):
+        super(Actor, self).on_enter()
+        self.collman = getattr(self.parent, 'collman', None)
+        if self.collman is not None and self.active:
+            self.collman.add(self)
+
+    def on_exit(self):
+        super(Actor, self).on_exit()
+        if self.collman is not None:
+            self.collman.remove_tricky(self)
+            self.collman = None
+
+    def kill(self):
+        # Killed actors stop colliding at once, but leave the layer in
+        # its end-of-frame sweep
+        if self.dead:
+            return
+        self.dead = True
+        if self.collman is not None:
+            self.collman.remove_tricky(self)
+        graveyard = getattr(self.parent, 'graveyard', None)
+        if graveyard is None:
+            self.sweep()
+        else:
+            graveyard.append(self)
+
+    def sweep(self):
+        super(Actor, self).kill()
 
     def move(self, offset):
         self.position += offset
         self.cshape.center += offset
+        if self.collman is not None:
+            self.collman.update(self)
+
+    def place(self, x, y):
+        self.position = (x, y)
+        center = self.cshape.center
+        center.x = x
+        center.y = y
+        if self.collman is not None:
+            self.collman.update(self)
 
     def update(self, elapsed):
         pass
@@ -40,7 +97,7 @@ class PlayerCannon(Actor):
         pressed = PlayerCannon.KEYS_PRESSED
         space_pressed = pressed[key.SPACE] == 1
         if PlayerShoot.INSTANCE is None and space_pressed:
-            self.parent.add(PlayerShoot(self.x, self.y + 50))
+            self.parent.player_shoots.acquire(self.x, self.y + 50)
 
         movement = pressed[key.RIGHT] - pressed[key.LEFT]
         w = self.width * 0.5
@@ -51,8 +108,12 @@ class PlayerCannon(Actor):
         other.kill()
         self.kill()
 
-class GameLayer(cocos.layer.Layer):
+class GameLayer(cocos.layer.Layer, cocos.batch.BatchNode):
+    # Every actor image lives in the same atlas texture, so drawing the
+    # layer as a batch node renders a whole wave in a few GL calls
     is_event_handler = True
+    MYSTERY_SHIP_RATE = 0.06
+    MAX_SHOOTS = 64
 
     def on_key_press(self, k, _):
         PlayerCannon.KEYS_PRESSED[k] = 1
@@ -60,20 +121,36 @@ class GameLayer(cocos.layer.Layer):
     def on_key_release(self, k, _):
         PlayerCannon.KEYS_PRESSED[k] = 0
     
-    def __init__(self, hud):
+    def __init__(self, hud, wave=None):
         super(GameLayer, self).__init__()
         w, h = cocos.director.director.get_window_size()
         self.hud = hud
+        self.wave = wave or Wave()
         self.width = w
         self.height = h
         self.lives = 3
         self.score = 0
+        self.timers = TimerWheel()
+        self.create_alien_group(100, 300)
+        self.shoots = ProjectilePool(Shoot, GameLayer.MAX_SHOOTS, self)
+        self.player_shoots = ProjectilePool(PlayerShoot, 1, self)
+        self.graveyard = []
         self.update_score()
         self.create_player()
-        self.create_alien_group(100, 300)
-        cell = 1.25 * 50
-        self.collman = cm.CollisionManagerGrid(0, w, 0, h, 
-                                               cell, cell)
+        # Aliens are hit-tested through their lattice, so the grid only
+        # holds the free movers. Most pooled shots sit parked, so size it
+        # for the ones live at once: each column fires at the wave's rate
+        # and a shot lives as long as it takes to cross the field
+        wave = self.wave
+        shots = min(wave.fire_rate * wave.cols * h / Shoot.SPEED,
+                    GameLayer.MAX_SHOOTS)
+        ships = GameLayer.MYSTERY_SHIP_RATE * w / MysteryShip.SPEED
+        live = 2 + shots + ships
+        shapes = [self.player.cshape, self.shoots.free[0].cshape]
+        cell = tune_cell_size(shapes, live, w, h)
+        self.collman = PersistentCollisionGrid(0, w, 0, h, cell, cell)
+        self.timers.schedule_poisson(GameLayer.MYSTERY_SHIP_RATE,
+                                     self.spawn_mystery_ship)
         self.schedule(self.update)
 
     def create_player(self):
@@ -85,36 +162,96 @@ class GameLayer(cocos.layer.Layer):
         self.score += score
         self.hud.update_score(self.score)
 
-    def create_alien_group(self, x, y):
-        self.alien_group = AlienGroup(x, y)
-        for alien in self.alien_group:
-            self.add(alien)
+    def add(self, child, z=0, name=None):
+        # Nested batch nodes, like the alien formation, keep their own batch
+        # and transform instead of joining this layer's batch
+        if isinstance(child, cocos.batch.BatchNode):
+            cocos.layer.Layer.add(self, child, z, name)
+        else:
+            super(GameLayer, self).add(child, z, name)
 
-    def update(self, dt):
-        self.collman.clear()
-        for _, node in self.children:
-            self.collman.add(node)
-            if not self.collman.knows(node):
-                self.remove(node)
-        self.collide(PlayerShoot.INSTANCE)
-        if self.collide(self.player):
-            self.respawn_player()
+    def remove(self, child):
+        if isinstance(child, cocos.batch.BatchNode):
+            cocos.layer.Layer.remove(self, child)
+        else:
+            super(GameLayer, self).remove(child)
+
+    def visit(self):
+        super(GameLayer, self).visit()
+        if self.visible:
+            gl.glPushMatrix()
+            self.transform()
+            for _, node in self.children:
+                if isinstance(node, cocos.batch.BatchNode):
+                    node.visit()
+            gl.glPopMatrix()
 
+    def create_alien_group(self, x, y):
+        self.alien_group = AlienGroup(x, y, self.width, self.wave)
+        self.add(self.alien_group)
         for column in self.alien_group.columns:
-            shoot = column.shoot()
-            if shoot is not None:
-                self.add(shoot)
+            self.timers.schedule_poisson(self.wave.fire_rate,
+                                         self.column_shoot, column)
+
+    def column_shoot(self, column):
+        column.shoot(self.shoots)
+        return len(column.aliens) > 0
 
+    def spawn_mystery_ship(self):
+        self.add(MysteryShip(50, self.height - 50))
+        return True
+
+    def update(self, dt):
+        self.check_collisions()
+        self.timers.advance(dt)
         for _, node in self.children:
             node.update(dt)
-        self.alien_group.update(dt)
-        if random.random() < 0.001:
-            self.add(MysteryShip(50, self.height - 50))
+        self.cull()
+        self.sweep()
 
+    def check_collisions(self):
+        self.collide_shoot(PlayerShoot.INSTANCE)
+        if self.collide(self.player):
+            self.respawn_player()
+
+    def cull(self):
+        # Only free movers can leave the screen between frames; the
+        # formation is checked through its bounds after it steps
+        movers = list(self.shoots.live)
+        movers.extend(self.player_shoots.live)
+        movers.extend(MysteryShip.INSTANCES)
+        for node in movers:
+            if not node.dead:
+                xmin, xmax, ymin, ymax = node.cshape.minmax()
+                if (xmax < 0 or xmin > self.width or
+                        ymax < 0 or ymin > self.height):
+                    node.kill()
+        if self.alien_group.stepped:
+            self.alien_group.stepped = False
+            self.alien_group.cull()
+
+    def sweep(self):
+        graveyard, self.graveyard = self.graveyard, []
+        for node in graveyard:
+            node.sweep()
+
+    def collide_shoot(self, shoot):
+        if shoot is None:
+            return
+        other = self.alien_group.hit_test(shoot)
+        if other is None:
+            ships = MysteryShip.INSTANCES
+            other = next((ship for ship in ships
+                          if shoot.cshape.overlaps(ship.cshape)), None)
+        if other is not None:
+            shoot.collide(other)
 
     def collide(self, node):
         if node is not None:
-            for other in self.collman.iter_colliding(node):
+            other = next(self.collman.iter_colliding(node), None)
+            if other is None:
+                other = self.alien_group.hit_test(node)
+            if other is not None:
                 node.collide(other)
                 return True
         return False
@@ -128,22 +265,18 @@ class GameLayer(cocos.layer.Layer):
             self.create_player()
 
 class Alien(Actor):
-    def load_animation(imgage):
-        seq = ImageGrid(load(imgage), 2, 1)
-        return Animation.from_image_sequence(seq, 0.5)
-    
     TYPES = {
-        '1': (load_animation('img/alien1.png'), 40),
-        '2': (load_animation('img/alien2.png'), 20),
-        '3': (load_animation('img/alien3.png'), 10)
+        '1': ('img/alien1.png', 40),
+        '2': ('img/alien2.png', 20),
+        '3': ('img/alien3.png', 10)
     }
 
-    def from_type(x, y, alien_type, column):
-        animation, score = Alien.TYPES[alien_type]
-        return Alien(animation, x, y, score, column)
+    def from_type(x, y, alien_type, column, scale=1):
+        path, score = Alien.TYPES[alien_type]
+        return Alien(atlas.animation(path), x, y, score, column, scale)
     
-    def __init__(self, img, x, y, score, column=None):
-        super(Alien, self).__init__(img, x, y)
+    def __init__(self, img, x, y, score, column=None, scale=1):
+        super(Alien, self).__init__(img, x, y, scale)
         self.score = score
         self.column = column
 
@@ -152,37 +285,150 @@ class Alien(Actor):
         if self.column:
             self.column.remove(self)
 
+class Wave(object):
+    # Alien types from the bottom row up; taller waves stretch the bands
+    TYPES = '33221'
+
+    def __init__(self, rows=5, cols=10, spacing=60, speed=10, period=1.0,
+                 fire_rate=0.06):
+        self.rows = rows
+        self.cols = cols
+        self.spacing = spacing
+        self.speed = speed
+        self.period = period
+        self.fire_rate = fire_rate
+
+    @classmethod
+    def fit(cls, count, width, height, **kwargs):
+        # Lay count aliens out over the upper part of the screen, shrinking
+        # the spacing (and the sprites with it) once they no longer fit
+        area_w, area_h = width * 0.75, height * 0.4
+        cols = max(1, int(round(math.sqrt(count * area_w / area_h))))
+        rows = int(math.ceil(count / float(cols)))
+        spacing = min(AlienGroup.SPACING, area_w / cols, area_h / rows)
+        return cls(rows, cols, spacing, **kwargs)
+
+    @property
+    def scale(self):
+        return min(1.0, self.spacing / float(AlienGroup.SPACING))
+
+    def types(self):
+        n = len(Wave.TYPES)
+        return [Wave.TYPES[row * n // self.rows] for row in range(self.rows)]
+
 class AlienColumn(object):
-    def __init__(self, x, y):
-        alien_types = enumerate(['3', '3', '2', '2', '1'])
-        self.aliens = [Alien.from_type(x, y+i*60, alien, self) 
+    def __init__(self, x, y, index=0, group=None, wave=None):
+        wave = wave or Wave()
+        alien_types = enumerate(wave.types())
+        self.index = index
+        self.group = group
+        self.aliens = [Alien.from_type(x, y + i * wave.spacing, alien, self,
+                                       wave.scale)
                        for i, alien in alien_types]
+        for row, alien in enumerate(self.aliens):
+            alien.row = row
 
-    def should_turn(self, d):
-        if len(self.aliens) == 0:
-            return False
-        alien = self.aliens[0]
-        x, width = alien.x, alien.parent.width
-        return x >= width - 50 and d == 1 or x <= 50 and d == -1
-    
     def remove(self, alien):
         self.aliens.remove(alien)
+        if self.group is not None:
+            self.group.discard(alien)
 
-    def shoot(self):
-        if random.random() < 0.001 and len(self.aliens) > 0:
+    def shoot(self, pool):
+        if len(self.aliens) > 0:
             pos = self.aliens[0].position
-            return Shoot(pos[0], pos[1] - 50)
+            if self.group is not None:
+                pos = self.group.point_to_world(pos)
+            return pool.acquire(pos[0], pos[1] - 50)
         return None
 
 
-class AlienGroup(object):
-    def __init__(self, x, y):
-        self.columns = [AlienColumn(x + i * 60, y)
-                        for i in range(10)]
-        self.speed = eu.Vector2(10, 0)
+class AlienGroup(cocos.batch.BatchNode):
+    # The aliens are laid out in the group's own coordinates and never move
+    # on their own: a formation step only moves this node, and hit tests
+    # go through the lattice instead of the collision grid
+    SPACING = 60
+
+    def __init__(self, x, y, width=800, wave=None):
+        super(AlienGroup, self).__init__()
+        wave = wave or Wave()
+        self.spacing = wave.spacing
+        self.columns = [AlienColumn(i * wave.spacing, 0, i, self, wave)
+                        for i in range(wave.cols)]
+        self.width = width
+        self.origin = np.array([x, y], dtype=float)
+        self.position = (x, y)
+        aliens = list(self)
+        for alien in aliens:
+            self.add(alien)
+        self.lattice = [list(column.aliens) for column in self.columns]
+        rows = np.array([alien.row for alien in aliens], dtype=int)
+        self.col_counts = np.array([len(c.aliens) for c in self.columns])
+        self.row_counts = np.bincount(rows) if len(rows) else np.zeros(0, int)
+        self.count = len(aliens)
+        self.reach = max([max(a.cshape.rx, a.cshape.ry) for a in aliens] or [0])
+        self.min_col, self.max_col = 0, len(self.columns) - 1
+        self.min_row, self.max_row = 0, len(self.row_counts) - 1
+        self._shrink()
+        self.speed = eu.Vector2(wave.speed, 0)
         self.direction = 1
         self.elapsed = 0.0
-        self.period = 1.0
+        self.period = wave.period
+        self.stepped = False
+
+    @property
+    def graveyard(self):
+        return getattr(self.parent, 'graveyard', None)
+
+    def _shrink(self):
+        while self.min_col <= self.max_col and not self.col_counts[self.min_col]:
+            self.min_col += 1
+        while self.max_col >= self.min_col and not self.col_counts[self.max_col]:
+            self.max_col -= 1
+        while self.min_row <= self.max_row and not self.row_counts[self.min_row]:
+            self.min_row += 1
+        while self.max_row >= self.min_row and not self.row_counts[self.max_row]:
+            self.max_row -= 1
+
+    def discard(self, alien):
+        self.lattice[alien.column.index][alien.row] = None
+        self.count -= 1
+        self.col_counts[alien.column.index] -= 1
+        self.row_counts[alien.row] -= 1
+        self._shrink()
+
+    def bounds(self):
+        x, y = self.origin
+        s = self.spacing
+        return (x + self.min_col * s, x + self.max_col * s,
+                y + self.min_row * s, y + self.max_row * s)
+
+    def hit_test(self, actor):
+        # Aliens sit on a fixed lattice around the origin, so only the
+        # lattice cells within reach of the actor can hold an overlapping
+        # alien; with the classic wave that is a 2x2 block
+        cshape = actor.cshape
+        x, y = cshape.center
+        s = self.spacing
+        x -= self.origin[0]
+        y -= self.origin[1]
+        rx = cshape.rx + self.reach
+        ry = cshape.ry + self.reach
+        cols = range(max(0, math.ceil((x - rx) / s)),
+                     min(len(self.lattice), math.floor((x + rx) / s) + 1))
+        row_lo = max(0, math.ceil((y - ry) / s))
+        row_hi = math.floor((y + ry) / s) + 1
+        for col in cols:
+            column = self.lattice[col]
+            for row in range(row_lo, min(len(column), row_hi)):
+                alien = column[row]
+                if alien is None:
+                    continue
+                other = alien.cshape
+                cx, cy = other.center
+                if (abs(cx - x) < cshape.rx + other.rx and
+                        abs(cy - y) < cshape.ry + other.ry):
+                    return alien
+        return None
 
     def update(self, elapsed):
         self.elapsed += elapsed
@@ -192,12 +438,30 @@ class AlienGroup(object):
             if self.side_reached():
                 self.direction *= -1
                 offset = eu.Vector2(0, -10)
-            for alien in self:
-                alien.move(offset)
+            self.origin += (offset.x, offset.y)
+            self.position = tuple(self.origin)
+            self.stepped = True
+
+    def cull(self):
+        # The formation turns at the sides, so only its bottom rows can
+        # leave the screen as it descends
+        if self.count == 0:
+            return
+        y = self.origin[1]
+        for row in range(self.min_row, self.max_row + 1):
+            if y + row * self.spacing + self.reach >= 0:
+                break
+            for column in self.lattice:
+                alien = column[row]
+                if alien is not None:
+                    alien.kill()
 
     def side_reached(self):
-        return any(map(lambda c: c.should_turn(self.direction), 
-                       self.columns))
+        if self.count == 0:
+            return False
+        xmin, xmax, _, _ = self.bounds()
+        d = self.direction
+        return xmax >= self.width - 50 and d == 1 or xmin <= 50 and d == -1
 
     def __iter__(self):
         for column in self.columns:
@@ -205,19 +469,43 @@ class AlienGroup(object):
                 yield alien
 
 class Shoot(Actor):
-    def __init__(self, x, y, img='img/shoot.png'):
+    SPEED = 400
+
+    def __init__(self, x=0, y=0, img='img/shoot.png'):
         super(Shoot, self).__init__(img, x, y)
-        self.speed = eu.Vector2(0, -400)
+        self.speed = eu.Vector2(0, -Shoot.SPEED)
+        self.pool = None
+
+    def spawn(self, x, y):
+        self.place(x, y)
+        self.active = True
+        self.dead = False
+        self.visible = True
+        if self.collman is not None:
+            self.collman.add(self)
+
+    def sweep(self):
+        if self.pool is None:
+            super(Shoot, self).sweep()
+        else:
+            self.active = False
+            self.visible = False
+            self.pool.release(self)
 
     def update(self, elapsed):
-        self.move(self.speed * elapsed)
+        if self.active:
+            self.place(self.x + self.speed.x * elapsed,
+                       self.y + self.speed.y * elapsed)
 
 class PlayerShoot(Shoot):
     INSTANCE = None
 
-    def __init__(self, x, y):
+    def __init__(self, x=0, y=0):
         super(PlayerShoot, self).__init__(x, y, 'img/laser.png')
         self.speed *= -1
+
+    def spawn(self, x, y):
+        super(PlayerShoot, self).spawn(x, y)
         PlayerShoot.INSTANCE = self
 
     def collide(self, other):
@@ -226,6 +514,10 @@ class PlayerShoot(Shoot):
             other.kill()
             self.kill()
 
+    def kill(self):
+        super(PlayerShoot, self).kill()
+        PlayerShoot.INSTANCE = None
+
     def on_exit(self):
         super(PlayerShoot, self).on_exit()
         PlayerShoot.INSTANCE = None
@@ -234,18 +526,27 @@ class HUD(cocos.layer.Layer):
     def __init__(self):
         super(HUD, self).__init__()
         w, h = cocos.director.director.get_window_size()
-        self.score_text = cocos.text.Label('', font_size=18)
+        self.score_text = cocos.text.Label('Score: ', font_size=18)
         self.score_text.position = (20, h - 40)
-        self.lives_text = cocos.text.Label('', font_size=18)
+        self.lives_text = cocos.text.Label('Lives: ', font_size=18)
         self.lives_text.position = (w - 100, h - 40)
         self.add(self.score_text)
         self.add(self.lives_text)
+        self.score = self.add_counter(self.score_text, 6)
+        self.lives = self.add_counter(self.lives_text, 2)
+
+    def add_counter(self, label, digits):
+        counter = DigitCounter(digits, font_size=18)
+        x, y = label.position
+        counter.position = (x + label.element.content_width, y)
+        self.add(counter)
+        return counter
 
     def update_score(self, score):
-        self.score_text.element.text = 'Score: %s' % score
+        self.score.set_value(score)
 
     def update_lives(self, lives):
-        self.lives_text.element.text = 'Lives: %s' % lives
+        self.lives.set_value(lives)
 
     def show_game_over(self):
         w, h = cocos.director.director.get_window_size()
@@ -257,18 +558,37 @@ class HUD(cocos.layer.Layer):
 
 class MysteryShip(Alien):
     SCORES = [10, 50, 100, 200]
+    INSTANCES = set()
+    SPEED = 150
 
     def __init__(self, x, y):
         score = random.choice(MysteryShip.SCORES)
         super(MysteryShip, self).__init__('img/alien4.png', x, y, 
                                           score)
-        self.speed = eu.Vector2(150, 0)
+        self.speed = eu.Vector2(MysteryShip.SPEED, 0)
+
+    def on_enter(self):
+        super(MysteryShip, self).on_enter()
+        MysteryShip.INSTANCES.add(self)
+
+    def on_exit(self):
+        super(MysteryShip, self).on_exit()
+        MysteryShip.INSTANCES.discard(self)
 
     def update(self, elapsed):
         self.move(self.speed * elapsed)
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile', action='store_true',
+                        help='print a scheduler profile on exit')
+    parser.add_argument('--trace',
+                        help='also write a Chrome trace of scheduled calls here')
+    args = parser.parse_args()
+    if args.profile or args.trace:
+        profiler.enable(args.trace)
+
     cocos.director.director.init(caption='Cocos Invaders', 
                                  width=800, height=650)
     main_scene = cocos.scene.Scene()
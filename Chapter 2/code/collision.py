@@ -0,0 +1,58 @@
+import math
+
+import cocos.collision_model as cm
+
+
+def tune_cell_size(shapes, count, width, height, factor=1.25):
+    # Cells a little larger than the biggest actor keep each one in at most
+    # four buckets; when only `count` actors are expected on the field at
+    # once, coarser cells holding about one actor each keep the bucket
+    # table small
+    if not shapes:
+        return factor * 50
+    extent = max(max(shape.rx, shape.ry) for shape in shapes) * 2
+    spread = math.sqrt(width * height / max(count, 1.0))
+    return max(factor * extent, spread)
+
+
+class PersistentCollisionGrid(cm.CollisionManagerGrid):
+    def __init__(self, xmin, xmax, ymin, ymax, cell_width, cell_height):
+        super(PersistentCollisionGrid, self).__init__(xmin, xmax, ymin, ymax,
+                                                      cell_width, cell_height)
+        self.cells = {}
+
+    def _cells_for(self, obj):
+        return tuple(self._iter_cells_for_aabb(obj.cshape.minmax()))
+
+    def add(self, obj):
+        cells = self._cells_for(obj)
+        self.cells[obj] = cells
+        for cell in cells:
+            self.buckets[cell].add(obj)
+
+    def remove_tricky(self, obj):
+        for cell in self.cells.pop(obj, ()):
+            self.buckets[cell].discard(obj)
+
+    def update(self, obj):
+        old = self.cells.get(obj)
+        if old is None:
+            return
+        cells = self._cells_for(obj)
+        if cells == old:
+            return
+        for cell in old:
+            self.buckets[cell].discard(obj)
+        self.cells[obj] = cells
+        for cell in cells:
+            self.buckets[cell].add(obj)
+
+    def clear(self):
+        super(PersistentCollisionGrid, self).clear()
+        self.cells.clear()
+
+    def knows(self, obj):
+        return obj in self.cells
+
+    def known_objs(self):
+        return set(self.cells)
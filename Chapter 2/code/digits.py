@@ -0,0 +1,53 @@
+import cocos.batch
+import cocos.sprite
+import pyglet.font
+
+DIGITS = '0123456789'
+
+_glyphs = {}
+
+
+def glyphs(font_size, font_name=None):
+    # The ten digits are rasterized once per font into pyglet's glyph
+    # atlas; every counter using that font shares the same regions
+    key = (font_name, font_size)
+    if key not in _glyphs:
+        font = pyglet.font.load(font_name, font_size)
+        _glyphs[key] = dict(zip(DIGITS, font.get_glyphs(DIGITS)))
+    return _glyphs[key]
+
+
+class DigitCounter(cocos.batch.BatchNode):
+    def __init__(self, digits=6, font_size=18, font_name=None):
+        super(DigitCounter, self).__init__()
+        self.glyphs = glyphs(font_size, font_name)
+        self.advance = max(g.advance for g in self.glyphs.values())
+        self.limit = 10 ** digits - 1
+        self.value = None
+        self.shown = [None] * digits
+        self.slots = []
+        for _ in range(digits):
+            slot = cocos.sprite.Sprite(self.glyphs['0'], anchor=(0, 0))
+            slot.visible = False
+            self.add(slot)
+            self.slots.append(slot)
+
+    def set_value(self, value):
+        value = max(0, min(int(value), self.limit))
+        if value == self.value:
+            return
+        self.value = value
+        text = str(value)
+        for i, slot in enumerate(self.slots):
+            char = text[i] if i < len(text) else None
+            if char == self.shown[i]:
+                continue
+            self.shown[i] = char
+            if char is None:
+                slot.visible = False
+                continue
+            glyph = self.glyphs[char]
+            slot.image = glyph
+            slot.position = (i * self.advance + glyph.vertices[0],
+                             glyph.vertices[1])
+            slot.visible = True
@@ -0,0 +1,23 @@
+class ProjectilePool(object):
+    def __init__(self, factory, capacity, layer):
+        self.free = []
+        self.live = set()
+        for _ in range(capacity):
+            projectile = factory()
+            projectile.pool = self
+            projectile.active = False
+            projectile.visible = False
+            layer.add(projectile)
+            self.free.append(projectile)
+
+    def acquire(self, x, y):
+        if not self.free:
+            return None
+        projectile = self.free.pop()
+        self.live.add(projectile)
+        projectile.spawn(x, y)
+        return projectile
+
+    def release(self, projectile):
+        self.live.discard(projectile)
+        self.free.append(projectile)
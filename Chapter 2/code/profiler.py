@@ -0,0 +1,131 @@
+import atexit
+import json
+import sys
+import time
+
+from collections import deque
+
+import cocos.cocosnode
+
+
+class Probe(object):
+    # Stands in for a scheduled callback. It compares equal to the callback
+    # it wraps, so unschedule() and pause_scheduler() still find it
+    def __init__(self, profiler, callback, key):
+        self.profiler = profiler
+        self.callback = callback
+        self.key = key
+
+    def __call__(self, dt, *args, **kwargs):
+        start = self.profiler.clock()
+        try:
+            return self.callback(dt, *args, **kwargs)
+        finally:
+            self.profiler.record(self.key, start)
+
+    def __eq__(self, other):
+        if isinstance(other, Probe):
+            other = other.callback
+        return self.callback == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.callback)
+
+
+class SchedulerProfiler(object):
+    def __init__(self, trace=False, max_events=1000000,
+                 clock=time.perf_counter):
+        self.clock = clock
+        self.origin = clock()
+        self.stats = {}
+        self.events = deque(maxlen=max_events) if trace else None
+        self.originals = None
+
+    def record(self, key, start):
+        elapsed = self.clock() - start
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += elapsed
+        if elapsed > stats[2]:
+            stats[2] = elapsed
+        if self.events is not None:
+            self.events.append((key, start, elapsed))
+
+    def wrap(self, node, callback):
+        name = getattr(callback, '__name__', repr(callback))
+        return Probe(self, callback, (type(node).__name__, name))
+
+    def install(self):
+        # Must run before any scene is built: callbacks scheduled earlier
+        # are not wrapped, and actions started earlier keep the original
+        # _step, which the patched one cannot unschedule
+        node = cocos.cocosnode.CocosNode
+        if self.originals is not None:
+            return
+        schedule, schedule_interval, step = self.originals = (
+            node.schedule, node.schedule_interval, node._step)
+        profiler = self
+
+        def profiled_schedule(self, callback, *args, **kwargs):
+            schedule(self, profiler.wrap(self, callback), *args, **kwargs)
+
+        def profiled_schedule_interval(self, callback, interval,
+                                       *args, **kwargs):
+            schedule_interval(self, profiler.wrap(self, callback), interval,
+                              *args, **kwargs)
+
+        def profiled_step(self, dt):
+            names = sorted(set(type(a).__name__ for a in self.actions))
+            key = (type(self).__name__, 'actions[%s]' % ','.join(names))
+            start = profiler.clock()
+            try:
+                step(self, dt)
+            finally:
+                profiler.record(key, start)
+
+        node.schedule = profiled_schedule
+        node.schedule_interval = profiled_schedule_interval
+        node._step = profiled_step
+
+    def uninstall(self):
+        if self.originals is not None:
+            node = cocos.cocosnode.CocosNode
+            (node.schedule, node.schedule_interval,
+             node._step) = self.originals
+            self.originals = None
+
+    def report(self, stream=sys.stdout):
+        rows = sorted(self.stats.items(), key=lambda item: -item[1][1])
+        stream.write('%-20s %-32s %8s %10s %9s %9s\n' %
+                     ('node', 'callback', 'calls', 'total ms',
+                      'mean ms', 'max ms'))
+        for (node, callback), (count, total, worst) in rows:
+            stream.write('%-20s %-32s %8d %10.2f %9.3f %9.3f\n' %
+                         (node, callback, count, total * 1e3,
+                          total / count * 1e3, worst * 1e3))
+
+    def dump_trace(self, path):
+        events = [{'name': '%s.%s' % key, 'cat': key[0], 'ph': 'X',
+                   'ts': (start - self.origin) * 1e6, 'dur': elapsed * 1e6,
+                   'pid': 0, 'tid': 0}
+                  for key, start, elapsed in self.events or ()]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def enable(trace_path=None):
+    profiler = SchedulerProfiler(trace=trace_path is not None)
+    profiler.install()
+
+    def dump():
+        profiler.report()
+        if trace_path is not None:
+            profiler.dump_trace(trace_path)
+
+    atexit.register(dump)
+    return profiler
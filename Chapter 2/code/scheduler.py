@@ -0,0 +1,50 @@
+import random
+
+
+class TimerWheel(object):
+    def __init__(self, resolution=1.0 / 60, size=256):
+        self.resolution = resolution
+        self.size = size
+        self.slots = [[] for _ in range(size)]
+        self.tick = 0
+        self.elapsed = 0.0
+        self.pending = 0
+
+    def schedule(self, delay, callback, *args):
+        ticks = max(1, int(round(delay / self.resolution)))
+        slot = (self.tick + ticks) % self.size
+        rounds = (ticks - 1) // self.size
+        self.slots[slot].append([rounds, callback, args])
+        self.pending += 1
+
+    def schedule_poisson(self, rate, callback, *args, **kwargs):
+        # Exponential gaps give a Poisson process whose rate does not
+        # depend on the frame rate. The callback keeps it alive by
+        # returning a true value.
+        rand = kwargs.get('rand', random)
+
+        def fire(*args):
+            if callback(*args):
+                self.schedule(rand.expovariate(rate), fire, *args)
+        self.schedule(rand.expovariate(rate), fire, *args)
+
+    def advance(self, dt):
+        self.elapsed += dt
+        while self.elapsed >= self.resolution:
+            self.elapsed -= self.resolution
+            self.tick += 1
+            slot = self.slots[self.tick % self.size]
+            if not slot:
+                continue
+            due = []
+            waiting = []
+            for entry in slot:
+                if entry[0] == 0:
+                    due.append(entry)
+                else:
+                    entry[0] -= 1
+                    waiting.append(entry)
+            self.slots[self.tick % self.size] = waiting
+            self.pending -= len(due)
+            for _, callback, args in due:
+                callback(*args)
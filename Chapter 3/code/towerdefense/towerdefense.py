@@ -1,12 +1,24 @@
+import argparse
+
 from cocos.director import director
 
 import pyglet.font
 import pyglet.resource
 
+import profiler
 from mainmenu import new_menu
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile', action='store_true',
+                        help='print a scheduler profile on exit')
+    parser.add_argument('--trace',
+                        help='also write a Chrome trace of scheduled calls here')
+    args = parser.parse_args()
+    if args.profile or args.trace:
+        profiler.enable(args.trace)
+
     pyglet.resource.path.append('assets')
     pyglet.resource.reindex()
     pyglet.font.add_file('assets/Oswald-Regular.ttf')